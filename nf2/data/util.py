@@ -85,6 +85,36 @@ def cartesian_to_spherical(v, f=np):
     return f.stack([r, t, p], -1)
 
 
+def cartesian_to_spherical_mask(v, radius_range, latitude_range, longitude_range, f=np):
+    """Convert cartesian coordinates to spherical coordinates and mask the points inside the spherical volume.
+
+    Ranges are given as (min, max) in solar radii and radians. Returns the spherical coordinates and a boolean mask
+    that is true for points inside the volume. The operations are evaluated one after another; with ``f=torch`` the
+    function can be wrapped with ``torch.compile`` to fuse them into a few kernels."""
+    c = cartesian_to_spherical(v, f=f)
+    r, t, p = c[..., 0], c[..., 1], c[..., 2]
+    min_r, max_r = radius_range
+    min_lat, max_lat = latitude_range
+    min_lon, max_lon = longitude_range
+    #
+    mask = r >= min_r
+    mask &= r < max_r
+    angle = None  # single buffer for the wrapped latitude and longitude
+    if min_lat != max_lat:
+        angle = t % np.pi
+        mask &= angle >= min_lat
+        mask &= angle < max_lat
+    if min_lon != max_lon:
+        angle = p % (2 * np.pi) if angle is None else f.remainder(p, 2 * np.pi, out=angle)
+        lon_cond = angle >= min_lon
+        lon_cond &= angle < max_lon
+        if max_lon > 2 * np.pi:
+            lon_cond |= (angle < max_lon - 2 * np.pi) & (angle >= 0)
+        mask &= lon_cond
+    #
+    return c, mask
+
+
 def img_to_los_trv_azi(b, f=np):
     B_los = b[..., 2]
     B_trv = (b[..., 0] ** 2 + b[..., 1] ** 2) ** 0.5
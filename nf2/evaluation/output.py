@@ -1,22 +1,31 @@
+import copy
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from functools import cached_property, lru_cache
+
 import numpy as np
 import torch
+import torch.distributed as dist
 from astropy import units as u, constants
 from astropy.coordinates import SkyCoord
 from dateutil.parser import parse
 from sunpy.coordinates import frames
 from sunpy.map import Map
-from torch import nn
 from tqdm import tqdm
 
-from nf2.data.util import spherical_to_cartesian, cartesian_to_spherical, vector_cartesian_to_spherical
+from nf2.data.util import spherical_to_cartesian, cartesian_to_spherical, vector_cartesian_to_spherical, \
+    cartesian_to_spherical_mask
 from nf2.evaluation.energy import get_free_mag_energy
 from nf2.evaluation.metric import energy, normalized_divergence
-from nf2.train.model import VectorPotentialModel, calculate_current_from_jacobian
+from nf2.train.model import BModel, VectorPotentialModel, calculate_current_from_jacobian
 
 
 def current_density(jac_matrix, **kwargs):
-    j = calculate_current_from_jacobian(jac_matrix, f=np) * constants.c / (4 * np.pi)
-    return j.to(u.G / u.s)
+    j = calculate_current_from_jacobian(jac_matrix.to_value(u.G / u.m), f=np)
+    j *= (constants.c / (4 * np.pi)).to_value(u.m / u.s)
+    return u.Quantity(j, u.G / u.s, copy=False)
 
 
 def b_nabla_bz(b, jac_matrix, **kwargs):
@@ -107,66 +116,151 @@ def free_energy(b, **kwargs):
     free_energy = get_free_mag_energy(b.to_value(u.G)) * u.erg * u.cm ** -3
     return free_energy
 
+
+@lru_cache(maxsize=8)
+def _linspace(start, stop, num, device):
+    # cached axis sampling for repeated grid evaluations (the returned tensor must not be modified)
+    return torch.linspace(start, stop, num, dtype=torch.float32, device=device)
+
+
+@lru_cache(maxsize=1)
+def _compiled_spherical_mask():
+    # conversion and volume mask compiled into fused kernels (shared by all outputs)
+    return torch.compile(cartesian_to_spherical_mask, dynamic=True)
+
+
 class BaseOutput:
 
-    def __init__(self, checkpoint, device=None):
+    def __init__(self, checkpoint, device=None, compile_model=False, bf16=False, tf32=False,
+                 distributed=False):
+        # torchrun (explicit opt-in): one process per GPU, each rank evaluates a shard of the coordinates
+        assert not distributed or dist.is_available(), 'Requires torch.distributed!'
         if device is None:
-            device = torch.device('cuda') if torch.cuda.is_available() else torch.device('cpu')
-
-        self.state = torch.load(checkpoint, map_location=device)
-        model = self.state['model']
+            if distributed and torch.cuda.is_available():
+                assert 'LOCAL_RANK' in os.environ, 'Distributed evaluation requires a torchrun launch (LOCAL_RANK)!'
+                device = torch.device('cuda', int(os.environ['LOCAL_RANK']))
+            else:
+                device = torch.device('cuda') if torch.cuda.is_available() else torch.device('cpu')
+        device = torch.device(device)
+        if device.type == 'cuda':
+            device = torch.device('cuda', torch.cuda.current_device() if device.index is None else device.index)
+        if distributed and device.type == 'cuda':
+            # avoid a CUDA context on GPU 0 in every rank (pinned memory, NCCL)
+            torch.cuda.set_device(device)
+        if distributed and not dist.is_initialized():
+            dist.init_process_group(backend='nccl' if device.type == 'cuda' else 'gloo')
+        self._distributed = distributed and dist.get_world_size() > 1
+
+        self.state = self._load_state(checkpoint)
+        model = self.state['model'].to(device)
         self._requires_grad = isinstance(model, VectorPotentialModel)
-        self.model = nn.DataParallel(model) if torch.cuda.device_count() > 1 else model
+        # bfloat16 autocast for evaluations without gradients (b only)
+        self._bf16 = bf16 and not self._requires_grad
+        # tensor cores (TF32) for float32 matmuls during the evaluation
+        self._tf32 = tf32 and device.type == 'cuda'
+        self._compile_model = compile_model
+
+        # single process with multiple GPUs: one model replica per device, batches are distributed round-robin
+        devices = [device]
+        if device.type == 'cuda' and not self._distributed and torch.cuda.device_count() > 1:
+            devices += [torch.device('cuda', i) for i in range(torch.cuda.device_count()) if i != device.index]
+        self._replicas = [self._build_replica(model if i == 0 else copy.deepcopy(model).to(d), d, compile_model)
+                          for i, d in enumerate(devices)]
+
+        self.model = model
         self.spatial_norm = 1
         self.device = device
         self.c = constants.c
-
-    @property
+        self._batch_sizes = {}
+
+    @staticmethod
+    def _load_state(checkpoint):
+        # memory-map the checkpoint on the host and only move the modules to the device
+        try:
+            return torch.load(checkpoint, map_location='cpu', mmap=True, weights_only=False)
+        except TypeError:  # torch < 2.1 (no mmap)
+            pass
+        except RuntimeError as e:  # legacy (non-zip) checkpoint
+            if 'mmap' not in str(e):
+                raise e
+        # the checkpoint contains the full modules (weights_only defaults to True for torch >= 2.6)
+        kwargs = {'weights_only': False} if 'weights_only' in inspect.signature(torch.load).parameters else {}
+        return torch.load(checkpoint, map_location='cpu', **kwargs)
+
+    @staticmethod
+    def _build_replica(model, device, compile_model):
+        replica = {'device': device, 'model': model, 'inference_model': model}
+        # B-field models: compute b and its jacobian in a single vectorized pass (no autograd graph per batch)
+        replica['batched_jacobian'] = BaseOutput._build_batched_jacobian(model) \
+            if type(model) is BModel and hasattr(torch, 'func') else None
+        if compile_model:
+            # gradient evaluations call autograd inside forward --> no CUDA graphs
+            replica['inference_model'] = torch.compile(model, mode='max-autotune')
+            replica['model'] = torch.compile(model, mode='max-autotune-no-cudagraphs')
+            if replica['batched_jacobian'] is not None:
+                replica['batched_jacobian'] = torch.compile(replica['batched_jacobian'],
+                                                            mode='max-autotune-no-cudagraphs')
+        return replica
+
+    @cached_property
     def G_per_dB(self):
         return self.state['data']['G_per_dB'] * u.G
 
-    @property
+    @cached_property
     def m_per_ds(self):
         return (self.state['data']['Mm_per_ds'] * u.Mm).to(u.m)
 
-    def load_coords(self, coords, batch_size=int(2 ** 12), progress=False, compute_jacobian=True,
-                    metrics={'j': current_density}):
-        batch_size = batch_size * torch.cuda.device_count() if torch.cuda.is_available() else batch_size
+    def load_coords(self, coords, **kwargs):
+        coords = torch.tensor(coords, dtype=torch.float32)
+        return self.load_coords_tensor(coords, **kwargs)
+
+    def load_coords_tensor(self, coords, batch_size=None, progress=False, compute_jacobian=True,
+                           metrics={'j': current_density}, host_coords=None):
+        """Evaluate the model for a coordinate tensor (on host or already on ``self.device``).
+
+        If no batch size is given, it is tuned once per evaluation mode (see ``_autotune_batch_size``).
+        The batch size refers to a single device. ``host_coords`` can provide an existing numpy copy of the
+        coordinates for the metrics (avoids an additional device to host transfer)."""
+        batch_size = self._autotune_batch_size(coords, compute_jacobian) if batch_size is None else batch_size
+
         def _load(coords):
-            # normalize and to tensor
-            coords = torch.tensor(coords / self.spatial_norm, dtype=torch.float32)
+            # normalize
+            coords = coords / self.spatial_norm
             coords_shape = coords.shape
             coords = coords.reshape((-1, 3))
 
-            model_out = {}
-            it = range(int(np.ceil(coords.shape[0] / batch_size)))
-            it = tqdm(it, desc='Load NF2') if progress else it
-            for k in it:
-                self.model.zero_grad()
-                coord = coords[k * batch_size: (k + 1) * batch_size]
-                coord = coord.to(self.device)
-                coord.requires_grad = True
-                result = self.model(coord, compute_jacobian=compute_jacobian)
-                for k, v in result.items():
-                    if k not in model_out:
-                        model_out[k] = []
-                    model_out[k] += [v.detach().cpu()]
-
-            model_out = {k: torch.cat(v) for k, v in model_out.items()}
+            # torchrun: each rank evaluates a contiguous shard of equal size
+            # (padded with the last coordinate, so that all ranks take part in the same collectives)
+            n_coords = coords.shape[0]
+            shard = self._distributed and n_coords > 0
+            if shard:
+                shard_size = int(np.ceil(n_coords / dist.get_world_size()))
+                local_coords = coords[dist.get_rank() * shard_size: (dist.get_rank() + 1) * shard_size]
+                padding = coords[-1:].expand(shard_size - local_coords.shape[0], 3)
+                coords = torch.cat([local_coords, padding])
+
+            model_out = self._evaluate_batches(coords, batch_size, compute_jacobian, progress)
+
+            if shard:
+                model_out = {k: self._all_gather(v, n_coords) for k, v in model_out.items()}
             model_out = {k: v.reshape(*coords_shape[:-1], *v.shape[1:]).numpy() for k, v in model_out.items()}
 
-            model_out['b'] = model_out['b'] * self.G_per_dB
+            # scale in place and attach units without copies
+            G_per_dB = self.G_per_dB.to_value(u.G)
+            model_out['b'] *= G_per_dB
+            model_out['b'] = u.Quantity(model_out['b'], u.G, copy=False)
             if 'a' in model_out:
-                model_out['a'] = model_out['a'] * self.G_per_dB * self.m_per_ds
+                model_out['a'] *= G_per_dB * self.m_per_ds.to_value(u.m)
+                model_out['a'] = u.Quantity(model_out['a'], u.G * u.m, copy=False)
             return model_out
 
         if compute_jacobian or self._requires_grad:
             model_out = _load(coords)
             jac_matrix = model_out['jac_matrix']
-            jac_matrix = jac_matrix * self.G_per_dB / self.m_per_ds
-            model_out['jac_matrix'] = jac_matrix
+            jac_matrix *= self.G_per_dB.to_value(u.G) / self.m_per_ds.to_value(u.m)
+            model_out['jac_matrix'] = u.Quantity(jac_matrix, u.G / u.m, copy=False)
 
-            state = {**model_out, 'coords': coords}
+            state = {**model_out, 'coords': coords.cpu().numpy() if host_coords is None else host_coords}
 
             for k, f in metrics.items():
                 model_out[k] = f(**state)
@@ -176,6 +270,222 @@ class BaseOutput:
             with torch.no_grad():
                 return _load(coords)
 
+    def _evaluate_batches(self, coords, batch_size, compute_jacobian, progress):
+        """Evaluate normalized (N, 3) coordinates and return the outputs as host tensors."""
+        use_bf16, requires_grad = self._evaluation_mode(compute_jacobian)
+        cuda = self.device.type == 'cuda'
+
+        # stream host coordinates through pinned memory and prefetch the next batch on a separate stream
+        copy_streams = [torch.cuda.Stream(r['device']) for r in self._replicas] if cuda else None
+
+        def _fetch(k):
+            coord = coords[k * batch_size: (k + 1) * batch_size]
+            device = self._replicas[k % len(self._replicas)]['device']
+            if not cuda:
+                return coord.to(device)
+            # pin only the current batch (the caching host allocator reuses the page-locked blocks)
+            coord = coord.pin_memory() if coord.device.type == 'cpu' else coord
+            with torch.cuda.stream(copy_streams[k % len(self._replicas)]):
+                return coord.to(device, non_blocking=True)
+
+        model_out = {}
+        coord_buffers = {}
+        n_coords = coords.shape[0]
+
+        # device outputs are copied asynchronously into a small ring of pinned staging buffers
+        # and from there into the pageable host outputs
+        staging = [{'event': None, 'buffers': {}} for _ in range(2 * len(self._replicas))] if cuda else []
+
+        def _flush(slot):
+            slot['event'].synchronize()
+            start, end = slot['range']
+            for key, buffer in slot['buffers'].items():
+                model_out[key][start:end] = buffer[:end - start]
+            slot['event'] = None
+
+        n_batches = int(np.ceil(n_coords / batch_size))
+        it = range(n_batches)
+        it = tqdm(it, desc='Load NF2') if progress else it
+        next_coord = _fetch(0) if n_batches > 0 else None
+        with torch.set_grad_enabled(requires_grad), self._matmul_precision():
+            for k in it:
+                replica_id = k % len(self._replicas)
+                replica = self._replicas[replica_id]
+                coord = next_coord
+                if cuda:
+                    compute_stream = torch.cuda.current_stream(replica['device'])
+                    compute_stream.wait_stream(copy_streams[replica_id])
+                    coord.record_stream(compute_stream)
+                if k + 1 < n_batches:
+                    next_coord = _fetch(k + 1)
+                if compute_jacobian and replica['batched_jacobian'] is not None:
+                    result = replica['batched_jacobian'](coord)
+                else:
+                    model = replica['model'] if compute_jacobian or self._requires_grad else replica['inference_model']
+                    if requires_grad:
+                        # persistent input buffer for gradient evaluations (avoids re-flagging each batch)
+                        if replica_id not in coord_buffers:
+                            coord_buffers[replica_id] = torch.empty((min(batch_size, n_coords), 3),
+                                                                    dtype=torch.float32, device=replica['device'],
+                                                                    requires_grad=True)
+                        coord_buffer = coord_buffers[replica_id]
+                        with torch.no_grad():
+                            coord_buffer[:coord.shape[0]].copy_(coord)
+                        coord = coord_buffer[:coord.shape[0]]
+                    with torch.autocast(self.device.type, dtype=torch.bfloat16, enabled=use_bf16):
+                        result = model(coord, compute_jacobian=compute_jacobian)
+                start, end = k * batch_size, min((k + 1) * batch_size, n_coords)
+                if cuda:
+                    slot = staging[k % len(staging)]
+                    if slot['event'] is not None:
+                        _flush(slot)
+                for key, v in result.items():
+                    v = v.detach().float() if use_bf16 else v.detach()
+                    if key not in model_out:
+                        # preallocate the full output on the host
+                        model_out[key] = torch.empty((n_coords, *v.shape[1:]), dtype=v.dtype)
+                    if not cuda:
+                        model_out[key][start:end] = v
+                        continue
+                    if key not in slot['buffers']:
+                        slot['buffers'][key] = torch.empty((min(batch_size, n_coords), *v.shape[1:]),
+                                                           dtype=v.dtype, pin_memory=True)
+                    slot['buffers'][key][:end - start].copy_(v, non_blocking=True)
+                if cuda:
+                    slot['range'] = (start, end)
+                    slot['event'] = torch.cuda.Event()
+                    slot['event'].record(torch.cuda.current_stream(replica['device']))
+                # release the outputs (and the autograd graph) before the next forward pass
+                del result, v
+
+        for slot in staging:
+            if slot['event'] is not None:
+                _flush(slot)
+        return model_out
+
+    def _all_gather(self, v, n_coords, chunk_size=int(2 ** 18)):
+        """Gather the equally sized host shards of all ranks into a host tensor of length ``n_coords``.
+
+        The shards are exchanged in chunks, so that the full result is never allocated on the device."""
+        world_size = dist.get_world_size()
+        shard_size = v.shape[0]
+        gathered = torch.empty((n_coords, *v.shape[1:]), dtype=v.dtype)
+        for start in range(0, shard_size, chunk_size):
+            local = v[start:start + chunk_size].to(self.device)
+            chunk = torch.empty((world_size, *local.shape), dtype=v.dtype, device=self.device)
+            dist.all_gather_into_tensor(chunk, local)
+            chunk = chunk.cpu()
+            for rank in range(world_size):
+                # skip the padding of the last shards
+                offset = rank * shard_size + start
+                n = min(local.shape[0], max(n_coords - offset, 0))
+                gathered[offset:offset + n] = chunk[rank, :n]
+        return gathered
+
+    @staticmethod
+    def _build_batched_jacobian(model):
+        def _forward(coord):
+            b = model(coord[None], compute_jacobian=False)['b'][0]
+            return b, b
+
+        batched_jacobian = torch.func.vmap(torch.func.jacrev(_forward, has_aux=True))
+
+        def _evaluate(coords):
+            jac_matrix, b = batched_jacobian(coords)
+            return {'b': b, 'jac_matrix': jac_matrix}
+
+        return _evaluate
+
+    @contextmanager
+    def _matmul_precision(self):
+        """Enable TF32 matmuls (if requested) and restore the previous global settings afterwards."""
+        if not self._tf32:
+            yield
+            return
+        previous = (torch.backends.cuda.matmul.allow_tf32, torch.backends.cudnn.allow_tf32,
+                    torch.get_float32_matmul_precision())
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+        torch.set_float32_matmul_precision('high')
+        try:
+            yield
+        finally:
+            torch.backends.cuda.matmul.allow_tf32, torch.backends.cudnn.allow_tf32 = previous[:2]
+            torch.set_float32_matmul_precision(previous[2])
+
+    def _evaluation_mode(self, compute_jacobian):
+        use_batched_jacobian = compute_jacobian and self._replicas[0]['batched_jacobian'] is not None
+        requires_grad = (compute_jacobian or self._requires_grad) and not use_batched_jacobian
+        use_bf16 = self._bf16 and not (compute_jacobian or self._requires_grad)
+        return use_bf16, requires_grad
+
+    def _autotune_batch_size(self, sample_coords, compute_jacobian=True,
+                             min_batch_size=int(2 ** 10), max_batch_size=int(2 ** 20)):
+        """Find the batch size with the highest throughput for the current device.
+
+        The batch size is doubled until the GPU runs out of memory or the throughput improves by less than 5%.
+        Each size is timed over several back-to-back batches, where the previous outputs are still alive during the
+        next pass (memory headroom for the evaluation loop).
+        Gradient evaluations require considerably more memory, therefore the result is cached per mode."""
+        if compute_jacobian in self._batch_sizes:
+            return self._batch_sizes[compute_jacobian]
+        if self.device.type != 'cuda' or sample_coords.numel() == 0:
+            return int(2 ** 12)
+
+        use_bf16, requires_grad = self._evaluation_mode(compute_jacobian)
+        # probe with the eager model (compiled models would recompile or record new CUDA graphs for every size)
+        model = self.model
+        batched_jacobian = self._build_batched_jacobian(model) \
+            if compute_jacobian and self._replicas[0]['batched_jacobian'] is not None else None
+        sample_coords = (sample_coords.reshape((-1, 3))[:max_batch_size] / self.spatial_norm).to(self.device)
+
+        def _forward(coord):
+            if batched_jacobian is not None:
+                return batched_jacobian(coord)
+            with torch.autocast(self.device.type, dtype=torch.bfloat16, enabled=use_bf16):
+                return model(coord, compute_jacobian=compute_jacobian)
+
+        def _run(batch_size, n_runs=3):
+            idx = torch.arange(batch_size, device=self.device) % sample_coords.shape[0]
+            coord = sample_coords[idx]
+            coord.requires_grad = True
+            with torch.set_grad_enabled(requires_grad), self._matmul_precision():
+                result = _forward(coord)  # untimed
+                torch.cuda.synchronize(self.device)
+                start_time = time.perf_counter()
+                for _ in range(n_runs):
+                    result = _forward(coord)  # the previous result is released after the pass
+                torch.cuda.synchronize(self.device)
+            del result
+            return batch_size * n_runs / (time.perf_counter() - start_time)
+
+        _run(min_batch_size)  # warm-up
+        best_batch_size, best_throughput = min_batch_size, 0
+        batch_size = min_batch_size
+        while batch_size <= max_batch_size:
+            try:
+                throughput = _run(batch_size)
+            except RuntimeError as e:  # torch.cuda.OutOfMemoryError
+                if 'out of memory' not in str(e):
+                    raise e
+                torch.cuda.empty_cache()
+                break
+            if throughput < best_throughput * 1.05:
+                break
+            best_batch_size, best_throughput = batch_size, throughput
+            batch_size *= 2
+        torch.cuda.empty_cache()
+
+        self._batch_sizes[compute_jacobian] = best_batch_size
+        return best_batch_size
+
+    def _meshgrid(self, *axes):
+        """Build a coordinate grid of shape (*sampling, 3) on ``self.device``.
+
+        Each axis is given as (start, stop, num) and sampled with ``torch.linspace``."""
+        axes = [_linspace(float(start), float(stop), int(num), self.device) for start, stop, num in axes]
+        return torch.stack(torch.meshgrid(*axes, indexing='ij'), -1)
+
 
 class CartesianOutput(BaseOutput):
 
@@ -203,14 +513,14 @@ class CartesianOutput(BaseOutput):
         Mm_per_pixel = self.Mm_per_pixel if Mm_per_pixel is None else Mm_per_pixel
         pixel_per_ds = self.Mm_per_ds / Mm_per_pixel
 
-        coords = np.stack(
-            np.meshgrid(np.linspace(x_min, x_max, int((x_max - x_min) * pixel_per_ds) + 1),
-                        np.linspace(y_min, y_max, int((y_max - y_min) * pixel_per_ds) + 1),
-                        np.linspace(z_min, z_max, int((z_max - z_min) * pixel_per_ds) + 1), indexing='ij'), -1)
+        coords = self._meshgrid((x_min, x_max, int((x_max - x_min) * pixel_per_ds) + 1),
+                                (y_min, y_max, int((y_max - y_min) * pixel_per_ds) + 1),
+                                (z_min, z_max, int((z_max - z_min) * pixel_per_ds) + 1))
 
-        model_out = self.load_coords(coords, **kwargs)
+        host_coords = coords.cpu().numpy()
+        model_out = self.load_coords_tensor(coords, host_coords=host_coords, **kwargs)
 
-        return {**model_out, 'coords': coords, 'Mm_per_pixel': Mm_per_pixel}
+        return {**model_out, 'coords': host_coords, 'Mm_per_pixel': Mm_per_pixel}
 
     def load_boundary(self, Mm_per_pixel=None, **kwargs):
         x_min, x_max = self.coord_range[0]
@@ -322,7 +632,7 @@ class HeightTransformOutput(CartesianOutput):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         assert 'transform_module' in self.state, 'Requires transform module!'
-        self.transform_module = self.state['transform_module']
+        self.transform_module = self.state['transform_module'].to(self.device)
 
         self.coord_range_list = self.state['data']['coord_range']
         self.height_mapping_list = self.state['data']['height_mapping']
@@ -397,75 +707,76 @@ class SphericalOutput(BaseOutput):
                        longitude_range: u.Quantity = (0, 2 * np.pi) * u.rad,
                        sampling=[100, 180, 360], **kwargs):
         radius_range = radius_range if radius_range is not None else self.radius_range
-        spherical_coords = np.stack(
-            np.meshgrid(
-                np.linspace(radius_range[0].to_value(u.solRad), radius_range[1].to_value(u.solRad), sampling[0]),
-                np.linspace(latitude_range[0].to_value(u.rad), latitude_range[1].to_value(u.rad), sampling[1]),
-                np.linspace(longitude_range[0].to_value(u.rad), longitude_range[1].to_value(u.rad), sampling[2]),
-                indexing='ij'), -1)
-        cartesian_coords = spherical_to_cartesian(spherical_coords)
+        spherical_coords = self._meshgrid(
+            (radius_range[0].to_value(u.solRad), radius_range[1].to_value(u.solRad), sampling[0]),
+            (latitude_range[0].to_value(u.rad), latitude_range[1].to_value(u.rad), sampling[1]),
+            (longitude_range[0].to_value(u.rad), longitude_range[1].to_value(u.rad), sampling[2]))
+        cartesian_coords = spherical_to_cartesian(spherical_coords, f=torch)
 
-        model_out = self.load_coords(cartesian_coords, **kwargs)
-        return {**model_out, 'coords': cartesian_coords, 'spherical_coords': spherical_coords}
+        host_coords = cartesian_coords.cpu().numpy()
+        model_out = self.load_coords_tensor(cartesian_coords, host_coords=host_coords, **kwargs)
+        return {**model_out, 'coords': host_coords,
+                'spherical_coords': spherical_coords.cpu().numpy()}
 
     def load(self,
              radius_range: u.Quantity = None,
              latitude_range: u.Quantity = (0, np.pi) * u.rad,
              longitude_range: u.Quantity = (0, 2 * np.pi),
-             resolution: u.Quantity = 64 * u.pix / u.solRad, nan_value=0, **kwargs):
+             resolution: u.Quantity = 64 * u.pix / u.solRad, nan_value=0, progress=False, block_size=int(2 ** 24),
+             **kwargs):
         radius_range = radius_range if radius_range is not None else self.radius_range
-        spherical_bounds = np.stack(
-            np.meshgrid(np.linspace(radius_range[0].to_value(u.solRad), radius_range[1].to_value(u.solRad), 50),
-                        np.linspace(latitude_range[0].to_value(u.rad), latitude_range[1].to_value(u.rad), 50),
-                        np.linspace(longitude_range[0].to_value(u.rad), longitude_range[1].to_value(u.rad), 50),
-                        indexing='ij'), -1)
+        spherical_bounds = self._meshgrid(
+            (radius_range[0].to_value(u.solRad), radius_range[1].to_value(u.solRad), 50),
+            (latitude_range[0].to_value(u.rad), latitude_range[1].to_value(u.rad), 50),
+            (longitude_range[0].to_value(u.rad), longitude_range[1].to_value(u.rad), 50))
 
-        cartesian_bounds = spherical_to_cartesian(spherical_bounds)
-        x_min, x_max = cartesian_bounds[..., 0].min(), cartesian_bounds[..., 0].max()
-        y_min, y_max = cartesian_bounds[..., 1].min(), cartesian_bounds[..., 1].max()
-        z_min, z_max = cartesian_bounds[..., 2].min(), cartesian_bounds[..., 2].max()
+        cartesian_bounds = spherical_to_cartesian(spherical_bounds, f=torch)
+        x_min, x_max = cartesian_bounds[..., 0].min().item(), cartesian_bounds[..., 0].max().item()
+        y_min, y_max = cartesian_bounds[..., 1].min().item(), cartesian_bounds[..., 1].max().item()
+        z_min, z_max = cartesian_bounds[..., 2].min().item(), cartesian_bounds[..., 2].max().item()
 
         res = resolution.to_value(u.pix / u.solRad)
-        coords = np.stack(
-            np.meshgrid(np.linspace(x_min, x_max, int((x_max - x_min) * res)),
-                        np.linspace(y_min, y_max, int((y_max - y_min) * res)),
-                        np.linspace(z_min, z_max, int((z_max - z_min) * res)), indexing='ij'), -1)
-        # flipped z axis
-        spherical_coords = cartesian_to_spherical(coords)
-        lat_coord = (spherical_coords[..., 1] % np.pi)
-        lon_coord = (spherical_coords[..., 2] % (2 * np.pi))
-        rad_coord = spherical_coords[..., 0]
-
-        min_lat, max_lat = latitude_range[0].to_value(u.rad), latitude_range[1].to_value(u.rad)
-        min_lon, max_lon = (longitude_range[0].to_value(u.rad), longitude_range[1].to_value(u.rad))
-
-        # only evaluate coordinates in simulation volume
-        if min_lat == max_lat:
-            lat_cond = np.ones_like(lat_coord, dtype=bool)
-        else:
-            lat_cond = (lat_coord >= min_lat) & (lat_coord < max_lat)
-        if min_lon == max_lon:
-            lon_cond = np.ones_like(lon_coord, dtype=bool)
-        else:
-            lon_cond = (lon_coord >= min_lon) & (lon_coord < max_lon)
-            if max_lon > 2 * np.pi:
-                lon_cond = lon_cond | ((lon_coord < max_lon - 2 * np.pi) & (lon_coord >= 0))
-        rad_cond = (rad_coord >= radius_range[0].to_value(u.solRad)) & (rad_coord < radius_range[1].to_value(u.solRad))
-        condition = rad_cond & lat_cond & lon_cond
-        sub_coords = coords[condition]
-
-        cube_shape = coords.shape[:-1]
-        model_out = self.load_coords(sub_coords, **kwargs)
-
+        xs, ys, zs = [_linspace(v_min, v_max, int((v_max - v_min) * res), self.device)
+                      for v_min, v_max in [(x_min, x_max), (y_min, y_max), (z_min, z_max)]]
+        cube_shape = (len(xs), len(ys), len(zs))
+        mask_kwargs = dict(radius_range=(radius_range[0].to_value(u.solRad), radius_range[1].to_value(u.solRad)),
+                           latitude_range=(latitude_range[0].to_value(u.rad), latitude_range[1].to_value(u.rad)),
+                           longitude_range=(longitude_range[0].to_value(u.rad), longitude_range[1].to_value(u.rad)),
+                           f=torch)
+
+        coords = np.empty(cube_shape + (3,), dtype=np.float32)
+        spherical_coords = np.empty(cube_shape + (3,), dtype=np.float32)
         spherical_out = {'spherical_coords': spherical_coords, 'coords': coords}
-        for k, sub_v in model_out.items():
-            volume = np.ones(cube_shape + sub_v.shape[1:]) * nan_value
-            if hasattr(sub_v, 'unit'): # preserve units
-                volume = volume * sub_v.unit
-            volume[condition] = sub_v
-            spherical_out[k] = volume
-
-        spherical_out['b_rtp'] = vector_cartesian_to_spherical(spherical_out['b'], spherical_coords)
+
+        spherical_mask = _compiled_spherical_mask() if self._compile_model else cartesian_to_spherical_mask
+        # process the volume in blocks of x-planes (row-major order is preserved for the masked points)
+        n_planes = max(1, block_size // max(1, cube_shape[1] * cube_shape[2]))
+        blocks = [slice(x_start, x_start + n_planes) for x_start in range(0, cube_shape[0], n_planes)]
+        it = tqdm(blocks, desc='Load NF2') if progress else blocks
+        for block in it:
+            block_coords = torch.stack(torch.meshgrid(xs[block], ys, zs, indexing='ij'), -1)
+            # flipped z axis
+            block_spherical, condition = spherical_mask(block_coords, **mask_kwargs)
+            coords[block] = block_coords.cpu().numpy()
+            spherical_coords[block] = block_spherical.cpu().numpy()
+            if not condition.any():
+                continue
+            # only evaluate coordinates in simulation volume
+            model_out = self.load_coords_tensor(block_coords[condition], **kwargs)
+            condition = condition.cpu().numpy()
+            for k, sub_v in model_out.items():
+                if k not in spherical_out:
+                    volume = np.full(cube_shape + sub_v.shape[1:], nan_value, dtype=sub_v.dtype)
+                    if hasattr(sub_v, 'unit'): # preserve units
+                        volume = u.Quantity(volume, sub_v.unit, copy=False)
+                    spherical_out[k] = volume
+                spherical_out[k][block][condition] = sub_v
+
+        b = spherical_out['b']
+        b_rtp = u.Quantity(np.empty(b.shape, dtype=b.dtype), b.unit, copy=False)
+        for block in blocks:
+            b_rtp[block] = vector_cartesian_to_spherical(b[block], spherical_coords[block])
+        spherical_out['b_rtp'] = b_rtp
 
         return spherical_out
 
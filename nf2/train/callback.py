@@ -9,13 +9,35 @@ import torch
 from nf2.data.util import cartesian_to_spherical, vector_cartesian_to_spherical, img_to_los_trv_azi, los_trv_azi_to_img
 from astropy import units as u
 
-class SphericalSlicesCallback(Callback):
+
+class _BPlotMixin:
+    """Keeps the B-field figure ``(fig, axs, ims)`` of a callback open and reuses it across validation epochs."""
+
+    def _b_figure(self, create_plot, update_plot, tight_layout=True):
+        if self._b_plot is None:
+            fig, axs, ims = create_plot()
+            update_plot(axs, ims)
+            if tight_layout:
+                fig.tight_layout()
+            self._b_plot = (fig, axs, ims)
+        else:
+            update_plot(*self._b_plot[1:])
+        return self._b_plot[0]
+
+    def teardown(self, trainer, pl_module, stage):
+        if self._b_plot is not None:
+            plt.close(self._b_plot[0])
+            self._b_plot = None
+
+
+class SphericalSlicesCallback(_BPlotMixin, Callback):
 
     def __init__(self, name, cube_shape, gauss_per_dB, Mm_per_ds):
         self.name = name
         self.cube_shape = cube_shape
         self.gauss_per_dB = gauss_per_dB
         self.Mm_per_ds = Mm_per_ds
+        self._b_plot = None
 
     def on_validation_epoch_end(self, trainer, pl_module):
         if self.name not in pl_module.validation_outputs:
@@ -25,45 +47,59 @@ class SphericalSlicesCallback(Callback):
         j = outputs['j'] * self.gauss_per_dB / self.Mm_per_ds
         coords = outputs['coords']
 
-        b_cube = b.reshape([*self.cube_shape, 3]).cpu().numpy()
-        j_cube = j.reshape([*self.cube_shape, 3]).cpu().numpy()
-        c_cube = coords.reshape([*self.cube_shape, 3]).cpu().numpy()
+        b_cube = b.reshape([*self.cube_shape, 3])
+        j_cube = j.reshape([*self.cube_shape, 3])
+        c_cube = coords.reshape([*self.cube_shape, 3])
 
-        # transform to spherical coordinates
-        c_cube = cartesian_to_spherical(c_cube)
-        b_cube = vector_cartesian_to_spherical(b_cube, c_cube)
+        # transform to spherical coordinates (on device)
+        c_cube = cartesian_to_spherical(c_cube, f=torch)
+        b_cube = vector_cartesian_to_spherical(b_cube, c_cube, f=torch)
 
         c_cube[..., 0] *= self.Mm_per_ds / (1 * u.solRad).to_value(u.Mm)
 
+        b_cube = b_cube.cpu().numpy()
+        j_cube = j_cube.cpu().numpy()
+        c_cube = c_cube.cpu().numpy()
+
         self.plot_b(b_cube, c_cube)
         self.plot_current(j_cube, c_cube)
 
     def plot_b(self, b, coords):
         n_samples = b.shape[0]
-        fig, axs = plt.subplots(3, n_samples, figsize=(n_samples * 4, 12))
-        for i in range(3):
-            for j in range(n_samples):
-                v_min_max = np.max(np.abs(b[j, :, :]))
-                # extent = [coords[j, 0, 0, 2], coords[j, -1, -1, 2],
-                #           coords[j, 0, 0, 1], coords[j, -1, -1, 1]]
-                # extent = np.rad2deg(extent)
-                extent = None
-                height = coords[j, :, :, 0].mean()
-                im = axs[i, j].imshow(b[j, :, :, i], cmap='gray', vmin=-v_min_max, vmax=v_min_max,
-                                      origin='upper', extent=extent)
-                axs[i, j].set_xlabel('Longitude [deg]')
-                axs[i, j].set_ylabel('Latitude [deg]')
-                # add locatable colorbar
-                divider = make_axes_locatable(axs[i, j])
-                cax = divider.append_axes("right", size="5%", pad=0.05)
-                plt.colorbar(im, cax=cax, label='B [G]')
-                axs[i, j].set_title(f'{height:.02f} - $B_{["r", "t", "p"][i]}$')
-        fig.tight_layout()
+
+        def _create_plot():
+            fig, axs = plt.subplots(3, n_samples, figsize=(n_samples * 4, 12))
+            ims = np.empty((3, n_samples), dtype=object)
+            for i in range(3):
+                for j in range(n_samples):
+                    # extent = [coords[j, 0, 0, 2], coords[j, -1, -1, 2],
+                    #           coords[j, 0, 0, 1], coords[j, -1, -1, 1]]
+                    # extent = np.rad2deg(extent)
+                    extent = None
+                    ims[i, j] = axs[i, j].imshow(b[j, :, :, i], cmap='gray', origin='upper', extent=extent,
+                                                 interpolation='none')
+                    axs[i, j].set_xlabel('Longitude [deg]')
+                    axs[i, j].set_ylabel('Latitude [deg]')
+                    # add locatable colorbar
+                    divider = make_axes_locatable(axs[i, j])
+                    cax = divider.append_axes("right", size="5%", pad=0.05)
+                    plt.colorbar(ims[i, j], cax=cax, label='B [G]')
+            return fig, axs, ims
+
+        def _update_plot(axs, ims):
+            for i in range(3):
+                for j in range(n_samples):
+                    v_min_max = np.max(np.abs(b[j, :, :]))
+                    height = coords[j, :, :, 0].mean()
+                    ims[i, j].set_data(b[j, :, :, i])
+                    ims[i, j].set_clim(-v_min_max, v_min_max)
+                    axs[i, j].set_title(f'{height:.02f} - $B_{["r", "t", "p"][i]}$')
+
+        fig = self._b_figure(_create_plot, _update_plot)
         wandb.log({f"{self.name} - B": fig})
-        plt.close('all')
 
     def plot_current(self, j, coords):
-        j = (j ** 2).sum(-1) ** 0.5
+        j = np.linalg.norm(j, axis=-1)
         n_samples = j.shape[0]
         fig, axs = plt.subplots(1, n_samples, figsize=(n_samples * 4, 4))
         for i in range(n_samples):
@@ -82,7 +118,7 @@ class SphericalSlicesCallback(Callback):
             axs[i].set_title(f'{height:.02f} - $|J|$')
         fig.tight_layout()
         wandb.log({f"{self.name} - Current density": fig})
-        plt.close('all')
+        plt.close(fig)
         # plot integrated current density
         j = np.sum(j, axis=0)
         fig, ax = plt.subplots(1, 1, figsize=(8, 8))
@@ -94,16 +130,17 @@ class SphericalSlicesCallback(Callback):
         #
         fig.tight_layout()
         wandb.log({f"{self.name} - Integrated Current density": fig})
-        plt.close('all')
+        plt.close(fig)
 
 
-class SlicesCallback(Callback):
+class SlicesCallback(_BPlotMixin, Callback):
 
     def __init__(self, name, cube_shape, gauss_per_dB, Mm_per_ds):
         self.name = name
         self.cube_shape = cube_shape
         self.gauss_per_dB = gauss_per_dB
         self.Mm_per_ds = Mm_per_ds
+        self._b_plot = None
 
     def on_validation_epoch_end(self, trainer, pl_module):
         if self.name not in pl_module.validation_outputs:
@@ -126,29 +163,39 @@ class SlicesCallback(Callback):
 
     def plot_b(self, b, coords):
         n_samples = b.shape[2]
-        fig, axs = plt.subplots(3, n_samples, figsize=(n_samples * 4, 12))
-        for i in range(3):
-            for j in range(n_samples):
-                v_min_max = np.max(np.abs(b[:, :, j]))
-                extent = [coords[0, 0, j, 0], coords[-1, -1, j, 0],
-                          coords[0, 0, j, 1], coords[-1, -1, j, 1]]
-                extent = np.array(extent) * self.Mm_per_ds
-                height = coords[:, :, j, 2].mean() * self.Mm_per_ds
-                im = axs[i, j].imshow(b[:, :, j, i].T, cmap='gray', vmin=-v_min_max, vmax=v_min_max,
-                                      origin='lower', extent=extent)
-                axs[i, j].set_xlabel('X [Mm]')
-                axs[i, j].set_ylabel('Y [Mm]')
-                # add locatable colorbar
-                divider = make_axes_locatable(axs[i, j])
-                cax = divider.append_axes("right", size="5%", pad=0.05)
-                plt.colorbar(im, cax=cax, label='B [G]')
-                axs[i, j].set_title(f'{height:.02f} - $B_{["x", "y", "z"][i]}$')
-        fig.tight_layout()
+
+        def _create_plot():
+            fig, axs = plt.subplots(3, n_samples, figsize=(n_samples * 4, 12))
+            ims = np.empty((3, n_samples), dtype=object)
+            for i in range(3):
+                for j in range(n_samples):
+                    extent = [coords[0, 0, j, 0], coords[-1, -1, j, 0],
+                              coords[0, 0, j, 1], coords[-1, -1, j, 1]]
+                    extent = np.array(extent) * self.Mm_per_ds
+                    ims[i, j] = axs[i, j].imshow(b[:, :, j, i].T, cmap='gray', origin='lower', extent=extent,
+                                                 interpolation='none')
+                    axs[i, j].set_xlabel('X [Mm]')
+                    axs[i, j].set_ylabel('Y [Mm]')
+                    # add locatable colorbar
+                    divider = make_axes_locatable(axs[i, j])
+                    cax = divider.append_axes("right", size="5%", pad=0.05)
+                    plt.colorbar(ims[i, j], cax=cax, label='B [G]')
+            return fig, axs, ims
+
+        def _update_plot(axs, ims):
+            for i in range(3):
+                for j in range(n_samples):
+                    v_min_max = np.max(np.abs(b[:, :, j]))
+                    height = coords[:, :, j, 2].mean() * self.Mm_per_ds
+                    ims[i, j].set_data(b[:, :, j, i].T)
+                    ims[i, j].set_clim(-v_min_max, v_min_max)
+                    axs[i, j].set_title(f'{height:.02f} - $B_{["x", "y", "z"][i]}$')
+
+        fig = self._b_figure(_create_plot, _update_plot)
         wandb.log({f"{self.name} - B": fig})
-        plt.close('all')
 
     def plot_current(self, j, coords):
-        j = (j ** 2).sum(-1) ** 0.5
+        j = np.linalg.norm(j, axis=-1)
         n_samples = j.shape[2]
         fig, axs = plt.subplots(1, n_samples, figsize=(n_samples * 4, 4))
         for i in range(n_samples):
@@ -168,7 +215,7 @@ class SlicesCallback(Callback):
             axs[i].set_ylabel('Y [Mm]')
         fig.tight_layout()
         wandb.log({f"{self.name} - Current density": fig})
-        plt.close('all')
+        plt.close(fig)
         # plot integrated current density
         j = np.sum(j, axis=2)
         fig, ax = plt.subplots(1, 1, figsize=(8, 8))
@@ -182,7 +229,7 @@ class SlicesCallback(Callback):
         #
         fig.tight_layout()
         wandb.log({f"{self.name} - Integrated Current density": fig})
-        plt.close('all')
+        plt.close(fig)
 
     def plot_pressure(self, p, coords):
         n_samples = p.shape[2]
@@ -204,7 +251,7 @@ class SlicesCallback(Callback):
             axs[i].set_ylabel('Y [Mm]')
         fig.tight_layout()
         wandb.log({f"{self.name} - Plasma Pressure": fig})
-        plt.close('all')
+        plt.close(fig)
         # plot integrated current density
         p = np.sum(p, axis=2)
         fig, ax = plt.subplots(1, 1, figsize=(8, 8))
@@ -218,18 +265,19 @@ class SlicesCallback(Callback):
         #
         fig.tight_layout()
         wandb.log({f"{self.name} - Integrated Plasma Pressure": fig})
-        plt.close('all')
+        plt.close(fig)
 
 
 
 
-class BoundaryCallback(Callback):
+class BoundaryCallback(_BPlotMixin, Callback):
 
     def __init__(self, validation_dataset_key, cube_shape, gauss_per_dB, Mm_per_ds):
         self.validation_dataset_key = validation_dataset_key
         self.cube_shape = cube_shape
         self.gauss_per_dB = gauss_per_dB
         self.Mm_per_ds = Mm_per_ds
+        self._b_plot = None
 
     def on_validation_epoch_end(self, trainer, pl_module):
         if self.validation_dataset_key not in pl_module.validation_outputs:
@@ -248,15 +296,14 @@ class BoundaryCallback(Callback):
         b_true = b_true * self.gauss_per_dB
 
         # compute diff
-        b_diff = torch.abs(b - b_true)
-        b_diff = torch.nanmean(b_diff.pow(2).sum(-1).pow(0.5))
+        b_diff = torch.nanmean(torch.linalg.vector_norm(b - b_true, dim=-1))
         evaluation = {'b_diff': b_diff.detach()}
 
         # compute diff error
         if 'b_err' in outputs:
             b_err = outputs['b_err'] * self.gauss_per_dB
             b_diff_err = torch.clip(torch.abs(b - b_true) - b_err, 0)
-            b_diff_err = torch.nanmean(b_diff_err.pow(2).sum(-1).pow(0.5))
+            b_diff_err = torch.nanmean(torch.linalg.vector_norm(b_diff_err, dim=-1))
             evaluation['b_diff_err'] = b_diff_err.detach()
 
         wandb.log({"valid": {self.validation_dataset_key: evaluation}})
@@ -275,103 +322,72 @@ class BoundaryCallback(Callback):
     def plot_b(self, b, b_true, original_coords):
         extent = None
 
-        fig, axs = plt.subplots(3, 2, figsize=(8, 8))
-
         b_norm = np.nanmax(np.abs(b_true))
         b_norm = min(500, b_norm)
 
-        im = axs[0, 0].imshow(b[..., 0].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[0, 0])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[0, 1].imshow(b_true[..., 0].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[0, 1])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[1, 0].imshow(b[..., 1].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[1, 0])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
+        def _create_plot():
+            fig, axs = plt.subplots(3, 2, figsize=(8, 8), constrained_layout=True)
+            ims = self._plot_components(fig, axs, b, b_true, b_norm, extent)
+            return fig, axs, ims
 
-        im = axs[1, 1].imshow(b_true[..., 1].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[1, 1])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
+        def _update_plot(axs, ims):
+            self._update_components(ims, b, b_true, b_norm)
 
-        im = axs[2, 0].imshow(b[..., 2].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[2, 0])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[2, 1].imshow(b_true[..., 2].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[2, 1])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        fig.tight_layout()
+        fig = self._b_figure(_create_plot, _update_plot, tight_layout=False)
         wandb.log({f"{self.validation_dataset_key} - B": fig})
-        plt.close('all')
 
     def plot_b_coords(self, b, b_true, original_coords, transformed_coords):
         extent = [original_coords[..., 0].min(), original_coords[..., 0].max(),
                   original_coords[..., 1].min(), original_coords[..., 1].max()]
 
-        fig, axs = plt.subplots(4, 2, figsize=(8, 8))
-
         b_norm = np.nanmax(np.abs(b_true))
         b_norm = min(500, b_norm)
 
-        im = axs[0, 0].imshow(b[..., 0].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[0, 0])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[0, 1].imshow(b_true[..., 0].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[0, 1])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[1, 0].imshow(b[..., 1].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[1, 0])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[1, 1].imshow(b_true[..., 1].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[1, 1])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[2, 0].imshow(b[..., 2].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[2, 0])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[2, 1].imshow(b_true[..., 2].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[2, 1])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='[G]')
-
-        im = axs[3, 0].imshow(transformed_coords[..., 2].T, cmap='inferno', origin='lower', vmin=0, extent=extent)
-        divider = make_axes_locatable(axs[3, 0])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='Z [Mm]')
-        axs[3, 0].set_title('Transformed z')
-        axs[3, 0].set_xlabel('X [Mm]')
-        axs[3, 0].set_ylabel('Y [Mm]')
+        def _create_plot():
+            fig, axs = plt.subplots(4, 2, figsize=(8, 8), constrained_layout=True)
+            ims = self._plot_components(fig, axs, b, b_true, b_norm, extent)
+
+            im_transformed = axs[3, 0].imshow(transformed_coords[..., 2].T, cmap='inferno', origin='lower', vmin=0,
+                                              extent=extent, interpolation='none')
+            fig.colorbar(im_transformed, ax=axs[3, 0], label='Z [Mm]')
+            axs[3, 0].set_title('Transformed z')
+            axs[3, 0].set_xlabel('X [Mm]')
+            axs[3, 0].set_ylabel('Y [Mm]')
+
+            im_original = axs[3, 1].imshow(original_coords[..., 2].T, cmap='inferno', origin='lower', extent=extent,
+                                           interpolation='none')
+            fig.colorbar(im_original, ax=axs[3, 1], label='Z [Mm]')
+            axs[3, 1].set_title('Original z')
+            axs[3, 1].set_xlabel('X [Mm]')
+            axs[3, 1].set_ylabel('Y [Mm]')
+
+            ims += [[im_transformed, im_original]]
+            return fig, axs, ims
+
+        def _update_plot(axs, ims):
+            self._update_components(ims, b, b_true, b_norm)
+            ims[3][0].set_data(transformed_coords[..., 2].T)
+            ims[3][0].set_clim(0, np.nanmax(transformed_coords[..., 2]))
+            ims[3][1].set_data(original_coords[..., 2].T)
+            ims[3][1].set_clim(np.nanmin(original_coords[..., 2]), np.nanmax(original_coords[..., 2]))
+
+        fig = self._b_figure(_create_plot, _update_plot, tight_layout=False)
+        wandb.log({f"{self.validation_dataset_key} - B": fig})
 
-        im = axs[3, 1].imshow(original_coords[..., 2].T, cmap='inferno', origin='lower', extent=extent)
-        divider = make_axes_locatable(axs[3, 1])
-        cax = divider.append_axes("right", size="5%", pad=0.05)
-        plt.colorbar(im, cax=cax, label='Z [Mm]')
-        axs[3, 1].set_title('Original z')
-        axs[3, 1].set_xlabel('X [Mm]')
-        axs[3, 1].set_ylabel('Y [Mm]')
+    def _plot_components(self, fig, axs, b, b_true, b_norm, extent):
+        # rows: B components; columns: extrapolation and observation (shared color scale per row)
+        ims = []
+        for i in range(3):
+            ims += [[axs[i, c].imshow(v[..., i].T, cmap='gray', vmin=-b_norm, vmax=b_norm, origin='lower',
+                                      extent=extent, interpolation='none') for c, v in enumerate([b, b_true])]]
+            fig.colorbar(ims[i][0], ax=axs[i, :], label='[G]')
+        return ims
 
-        fig.tight_layout()
-        wandb.log({f"{self.validation_dataset_key} - B": fig})
-        plt.close('all')
+    def _update_components(self, ims, b, b_true, b_norm):
+        for i in range(3):
+            for c, v in enumerate([b, b_true]):
+                ims[i][c].set_data(v[..., i].T)
+                ims[i][c].set_clim(-b_norm, b_norm)
 
 class LosTrvAziBoundaryCallback(Callback):
 
@@ -401,15 +417,13 @@ class LosTrvAziBoundaryCallback(Callback):
         b_xyz = los_trv_azi_to_img(b, f=torch)
         b_true_xyz = los_trv_azi_to_img(b_true, f=torch)
         # compute diff
-        b_diff = torch.abs(b_xyz - b_true_xyz)
-        b_diff = torch.nanmean(b_diff.pow(2).sum(-1).pow(0.5))
+        b_diff = torch.nanmean(torch.linalg.vector_norm(b_xyz - b_true_xyz, dim=-1))
         evaluation = {'b_diff': b_diff.detach()}
         #
         b_xyz = los_trv_azi_to_img(b, ambiguous=True, f=torch)
         b_true_xyz = los_trv_azi_to_img(b_true, ambiguous=True, f=torch)
         # compute diff
-        b_diff = torch.abs(b_xyz - b_true_xyz)
-        b_diff = torch.nanmean(b_diff.pow(2).sum(-1).pow(0.5))
+        b_diff = torch.nanmean(torch.linalg.vector_norm(b_xyz - b_true_xyz, dim=-1))
         evaluation['b_amb_diff'] = b_diff.detach()
 
         wandb.log({"valid": {self.validation_dataset_key: evaluation}})
@@ -472,7 +486,7 @@ class LosTrvAziBoundaryCallback(Callback):
 
         fig.tight_layout()
         wandb.log({f"{self.validation_dataset_key} - B": fig})
-        plt.close('all')
+        plt.close(fig)
 
     def plot_b_coords(self, b, b_true, original_coords, transformed_coords):
         extent = [original_coords[..., 0].min(), original_coords[..., 0].max(),
@@ -537,7 +551,7 @@ class LosTrvAziBoundaryCallback(Callback):
 
         fig.tight_layout()
         wandb.log({f"{self.validation_dataset_key} - B": fig})
-        plt.close('all')
+        plt.close(fig)
 
 
 class MetricsCallback(Callback):
@@ -557,23 +571,28 @@ class MetricsCallback(Callback):
 
         div = outputs['div'] * self.gauss_per_dB / self.Mm_per_ds
 
-        norm = torch.norm(b, dim=-1) * torch.norm(j, dim=-1)
-        sigma = torch.norm(torch.cross(j, b, dim=-1), dim=-1) / norm
-        j_weight = torch.norm(j, dim=-1)
-        angle = (sigma * j_weight).sum() / j_weight.sum()
+        # shared norms
+        cross_jb = torch.linalg.cross(j, b, dim=-1)
+        cross_norm = torch.linalg.vector_norm(cross_jb, dim=-1)
+        b_norm = torch.linalg.vector_norm(b, dim=-1) + 1e-7
+        j_norm = torch.linalg.vector_norm(j, dim=-1)
+
+        # sigma * |J| = |J x B| / |B|
+        jb_ratio = cross_norm / b_norm
+        angle = jb_ratio.sum() / j_norm.sum()
         angle = torch.clip(angle, -1. + 1e-7, 1. - 1e-7)
         theta_J = torch.arcsin(angle)
         theta_J = torch.rad2deg(theta_J)
 
-        sigma_J = (torch.norm(torch.cross(j, b, dim=-1), dim=-1) / (torch.norm(b, dim=-1) + 1e-7)).sum() / (torch.norm(j, dim=-1).sum() + 1e-7)
+        sigma_J = jb_ratio.sum() / (j_norm.sum() + 1e-7)
 
-        b_norm = b.pow(2).sum(-1).pow(0.5) + 1e-7
         div_loss = (div / b_norm).mean()
 
-        ff_loss = torch.cross(j, b, dim=-1).pow(2).sum(-1).pow(0.5) / b_norm
-        ff_loss = ff_loss.mean()
+        ff_loss = jb_ratio.mean()
 
-        wandb.log({"valid": {"divergence": div_loss.cpu().numpy(),
-                             "force-free": ff_loss.cpu().numpy(),
-                             "sigma_J": sigma_J.cpu().numpy(),
-                             "theta_J": theta_J.cpu().numpy()}})
+        # single device to host transfer
+        div_loss, ff_loss, sigma_J, theta_J = torch.stack([div_loss, ff_loss, sigma_J, theta_J]).cpu().numpy()
+        wandb.log({"valid": {"divergence": div_loss,
+                             "force-free": ff_loss,
+                             "sigma_J": sigma_J,
+                             "theta_J": theta_J}})